@@ -0,0 +1,202 @@
+"""
+Generate a deterministic synthetic corpus of images and PDFs to benchmark the scripts against.
+
+The same seed always produces byte-for-byte the same corpus (for a given Pillow version), so timings
+taken on different days or branches are measured against identical inputs.
+
+    uv run benchmarks/corpus.py benchmarks/.corpus
+"""
+
+import io
+import os
+import json
+import random
+import argparse
+
+from PIL import Image, ImageDraw
+
+SEED = 7
+
+# (width, height) of the generated photos, and how many of each to generate per format
+RESOLUTIONS = [(640, 480), (1920, 1080), (3000, 2000)]
+IMAGES_PER_RESOLUTION = 2
+IMAGE_FORMATS = ["jpg", "png"]
+
+# Number of pages of each generated PDF
+PDF_PAGES = [5, 25, 100]
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore "
+    "magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo consequat"
+).split()
+
+
+# IMAGES
+# ------
+
+def synthetic_image(width: int, height: int, rng: random.Random) -> Image.Image:
+    """Draws a photo-like image: a gradient background covered in overlapping shapes, with some grain"""
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(200):
+        x, y = rng.randrange(width), rng.randrange(height)
+        w, h = rng.randrange(1, width // 4), rng.randrange(1, height // 4)
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        if rng.random() < 0.5:
+            draw.ellipse((x, y, x + w, y + h), fill=color)
+        else:
+            draw.rectangle((x, y, x + w, y + h), fill=color)
+
+    # Flat shapes compress unrealistically well, so add grain like a camera sensor would
+    size = (width // 2, height // 2)
+    grain = Image.frombytes("RGB", size, rng.randbytes(size[0] * size[1] * 3)).resize((width, height))
+    return Image.blend(image, grain, 0.1)
+
+
+def synthetic_exif(index: int) -> Image.Exif:
+    """Builds the EXIF metadata a camera would typically write"""
+    exif = Image.Exif()
+    exif[0x010F] = "Synthetic"                              # Make
+    exif[0x0110] = "Benchmark Camera"                       # Model
+    exif[0x0131] = "benchmarks/corpus.py"                   # Software
+    exif[0x0132] = f"2024:01:01 00:00:{index % 60:02d}"     # DateTime
+    exif[0x010E] = f"Synthetic image #{index}"              # ImageDescription
+    return exif
+
+
+def generate_images(directory: str, rng: random.Random) -> list[str]:
+    """Generates the photos (with EXIF metadata) into the directory, returning their paths"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for width, height in RESOLUTIONS:
+        for i in range(IMAGES_PER_RESOLUTION):
+            image = synthetic_image(width, height, rng)
+            for format in IMAGE_FORMATS:
+                path = os.path.join(directory, f"{width}x{height}_{i}.{format}")
+                image.save(path, exif=synthetic_exif(len(paths)))
+                paths.append(path)
+    return paths
+
+
+# PDF
+# ---
+
+def pdf_string(text: str) -> bytes:
+    """Escapes text as a PDF string literal"""
+    return b"(" + text.encode("latin-1").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def write_pdf(path: str, pages: int, rng: random.Random):
+    """
+    Writes a PDF where every page holds a few paragraphs of text and an embedded JPEG image.
+
+    The file is assembled by hand (no PDF library is needed to write it), using the standard
+    Helvetica font and DCT-encoded (JPEG) image XObjects.
+    """
+    objects: list[bytes] = []
+
+    def add(obj: bytes) -> int:
+        objects.append(obj)
+        return len(objects)
+
+    def stream(dictionary: bytes, data: bytes) -> bytes:
+        return b"<< " + dictionary + b" /Length %d >>\nstream\n" % len(data) + data + b"\nendstream"
+
+    catalog = add(b"")  # Filled in once the page tree exists
+    tree = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for number in range(pages):
+        # An embedded photo
+        buffer = io.BytesIO()
+        synthetic_image(480, 320, rng).save(buffer, "JPEG", quality=80)
+        image = add(stream(b"/Type /XObject /Subtype /Image /Width 480 /Height 320 /ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode", buffer.getvalue()))
+
+        # A heading and a few paragraphs of text
+        lines = [f"Page {number + 1}"] + [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(30)]
+        text = b"BT /F1 11 Tf 14 TL 56 780 Td " + b" ".join(pdf_string(line) + b" '" for line in lines) + b" ET"
+        drawing = b"q 240 0 0 160 300 40 cm /Im1 Do Q"
+        content = add(stream(b"", text + b"\n" + drawing))
+
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R " % (tree, content)
+            + b"/Resources << /Font << /F1 %d 0 R >> /XObject << /Im1 %d 0 R >> >> >>" % (font, image)
+        ))
+
+    objects[tree - 1] = b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % p for p in page_ids) + b"] /Count %d >>" % pages
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % tree
+    info = add(b"<< /Title (Synthetic benchmark document) /Author (benchmarks/corpus.py) /Producer (benchmarks/corpus.py) >>")
+
+    # Write the objects, then the cross-reference table pointing at each of them
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, info, xref)
+
+    with open(path, "wb") as f:
+        f.write(output)
+
+
+def generate_pdfs(directory: str, rng: random.Random) -> list[str]:
+    """Generates the PDFs into the directory, returning their paths"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for pages in PDF_PAGES:
+        path = os.path.join(directory, f"{pages}_pages.pdf")
+        write_pdf(path, pages, rng)
+        paths.append(path)
+    return paths
+
+
+# CORPUS
+# ------
+
+def spec(seed: int) -> dict:
+    """Describes what a corpus generated with this seed contains"""
+    return {"seed": seed, "resolutions": RESOLUTIONS, "image_formats": IMAGE_FORMATS, "pdf_pages": PDF_PAGES}
+
+
+def generate(directory: str, seed: int = SEED) -> dict[str, list[str]]:
+    """Generates the whole corpus into the directory, returning the paths of the images and PDFs"""
+    rng = random.Random(seed)
+    files = {
+        "images": generate_images(os.path.join(directory, "images"), rng),
+        "pdfs": generate_pdfs(os.path.join(directory, "pdfs"), rng),
+    }
+
+    # Record what was generated, so it can be reused as long as the spec hasn't changed
+    with open(os.path.join(directory, "corpus.json"), "w", encoding="utf-8") as f:
+        json.dump({"spec": spec(seed), "files": files}, f, indent=2)
+    return files
+
+
+def ensure(directory: str, seed: int = SEED) -> dict[str, list[str]]:
+    """Returns the paths of the corpus in the directory, (re)generating it if it's missing or out of date"""
+    try:
+        with open(os.path.join(directory, "corpus.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["spec"] == json.loads(json.dumps(spec(seed))):
+            return manifest["files"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return generate(directory, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="Directory to generate the corpus into")
+    parser.add_argument("--seed", type=int, default=SEED, help=f"Random seed (default: {SEED})")
+    args = parser.parse_args()
+
+    corpus = generate(args.directory, args.seed)
+    print(f"Generated {len(corpus['images'])} images and {len(corpus['pdfs'])} PDFs in '{args.directory}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Measure the cold-start cost of each script, and enforce a startup budget.
+
+Each case is run several times under `python -X importtime`. The import time reported is the median
+across runs, not counting the modules a bare interpreter imports anyway. A case fails if it goes over its
+budget, exits with an error, or imports a module it should have deferred (like `PIL` just to print `--help`).
+
+Run it from the development environment (after `uv sync`), so the scripts' dependencies are installed:
+
+    uv run benchmarks/startup.py
+"""
+
+import os
+import sys
+import json
+import statistics
+import subprocess
+import argparse
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+
+# Command-line invocations: (script, arguments, import budget in ms, modules that must not be imported)
+CLI_CASES = [
+    ("encoding/convert-base64.py", ["enc", "hello"],      75, []),
+    ("encoding/convert-url.py",    ["encode", "a b"],     75, ["multiprocessing"]),
+    ("generate_password.py",       ["--help"],            75, []),
+    ("find_esp32.py",              ["--help"],            75, ["concurrent.futures"]),
+    ("images/convert.py",          ["--help"],            75, ["PIL"]),
+    ("images/create_pdf.py",       ["--help"],            75, ["PIL"]),
+    ("images/exif.py",             ["--help"],            75, ["PIL"]),
+    ("pdf/extract.py",             ["--help"],            75, ["pypdf"]),
+    ("reference/dictionary.py",    ["--help"],            75, ["requests"]),
+    ("reference/unicode.py",       ["info", "a"],         75, ["requests"]),
+]
+
+# Library imports: (script, module name, import budget in ms, modules that must not be imported)
+IMPORT_CASES = [
+    ("images/convert.py", "convert", 25, ["defcmd", "PIL"]),
+    ("images/exif.py",    "exif",    25, ["defcmd", "PIL"]),
+]
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """Parses `-X importtime` output into the cumulative import time (in µs) of each top-level import"""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # The header row
+        # Nested imports are indented; only the outermost ones add up to the total
+        if not name.startswith("  "):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def imported_modules(stderr: str) -> set[str]:
+    """Returns the names of all modules imported, at any depth, according to `-X importtime` output"""
+    return {line.rsplit("|", 1)[1].strip() for line in stderr.splitlines() if line.startswith("import time:")}
+
+
+def measure(command: list[str], runs: int, baseline: set[str] = frozenset()) -> dict:
+    """
+    Runs a command several times under `-X importtime`, returning median import and wall-clock times.
+
+    Top-level imports named in `baseline` (those of a bare interpreter) are left out of the import time.
+    """
+    import_times, wall_times = [], []
+    modules: set[str] = set()
+    top: dict[str, int] = {}
+    error = None
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, "-X", "importtime", *command], capture_output=True, text=True, cwd=ROOT)
+        wall_times.append(time.perf_counter() - start)
+        if process.returncode != 0:
+            error = process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f"exit code {process.returncode}"
+            break
+        top = {name: us for name, us in parse_importtime(process.stderr).items() if name not in baseline}
+        import_times.append(sum(top.values()) / 1000)
+        modules = imported_modules(process.stderr)
+
+    return {
+        "import_ms": statistics.median(import_times) if import_times else None,
+        "wall_ms": statistics.median(wall_times) * 1000,
+        "heaviest": sorted(top, key=top.get, reverse=True)[:3],
+        "modules": modules,
+        "error": error,
+    }
+
+
+def check(name: str, command: list[str], budget: int, forbidden: list[str], runs: int, baseline: set[str]) -> dict:
+    """Measures a case and checks it against its budget and forbidden imports"""
+    result = measure(command, runs, baseline)
+    modules = result.pop("modules")
+    leaked = sorted(m for m in forbidden if any(mod == m or mod.startswith(m + ".") for mod in modules))
+    over = result["import_ms"] is not None and result["import_ms"] > budget
+    return {
+        "case": name,
+        "budget_ms": budget,
+        **result,
+        "leaked": leaked,
+        "ok": result["error"] is None and not over and not leaked,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Number of runs per case (default: 5)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    # Whatever a bare interpreter imports at startup isn't the scripts' fault
+    baseline = set(parse_importtime(subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"], capture_output=True, text=True).stderr))
+
+    results = []
+    for script, arguments, budget, forbidden in CLI_CASES:
+        command = [os.path.join(SCRIPTS, script), *arguments]
+        results.append(check(f"{script} {' '.join(arguments)}", command, budget, forbidden, args.runs, baseline))
+    for script, module, budget, forbidden in IMPORT_CASES:
+        directory = os.path.dirname(os.path.join(SCRIPTS, script))
+        command = ["-c", f"import sys; sys.path.insert(0, {directory!r}); import {module}"]
+        results.append(check(f"import {module}", command, budget, forbidden, args.runs, baseline))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            status = "ok  " if r["ok"] else "FAIL"
+            imports = f"{r['import_ms']:7.1f} ms" if r["import_ms"] is not None else "      - ms"
+            print(f"{status} {r['case']:<42} imports {imports} / {r['budget_ms']:>3} ms   wall {r['wall_ms']:7.1f} ms   heaviest: {', '.join(r['heaviest'])}")
+            if r["leaked"]:
+                print(f"     imports deferred modules: {', '.join(r['leaked'])}")
+            if r["error"]:
+                print(f"     error: {r['error']}")
+
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
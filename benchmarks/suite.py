@@ -0,0 +1,161 @@
+"""
+Time the scripts' main entry points over a synthetic corpus, and flag regressions against a baseline.
+
+The corpus (see `corpus.py`) is generated on first use, and regenerated whenever its spec changes. Each case
+runs once to warm up, then `--repeat` times; the median is what gets compared. Save a baseline on one revision, then compare another against it:
+
+    uv run benchmarks/suite.py --save baseline.json
+    uv run benchmarks/suite.py --compare baseline.json --threshold 0.1
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import importlib.util
+from contextlib import redirect_stdout
+from typing import Callable
+
+import corpus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, "scripts")
+CORPUS = os.path.join(ROOT, "benchmarks", ".corpus")
+
+
+def load(script: str):
+    """Imports a script as a module (the scripts aren't a package, and some names aren't valid identifiers)"""
+    name = os.path.splitext(os.path.basename(script))[0] + "_under_benchmark"
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPTS, script))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# CASES
+# -----
+
+def cases(files: dict[str, list[str]], workdir: str) -> dict[str, Callable[[], None]]:
+    """Builds the benchmark cases: each one processes a slice of the corpus with a single entry point"""
+    convert = load("images/convert.py")
+    create_pdf = load("images/create_pdf.py")
+    exif = load("images/exif.py")
+    extract = load("pdf/extract.py")
+    unicode = load("reference/unicode.py")
+
+    def named(pattern: str) -> list[str]:
+        return [path for path in files["images"] if os.path.basename(path).startswith(pattern)]
+
+    result = {}
+    for width, height in corpus.RESOLUTIONS:
+        size = f"{width}x{height}"
+        jpgs = [path for path in named(size) if path.endswith(".jpg")]
+        pngs = [path for path in named(size) if path.endswith(".png")]
+
+        result[f"convert_image/{size}/jpg-to-png"] = lambda jpgs=jpgs: [convert.convert_image(p, os.path.join(workdir, "out.png")) for p in jpgs]
+        result[f"convert_image/{size}/png-to-jpg"] = lambda pngs=pngs: [convert.convert_image(p, os.path.join(workdir, "out.jpg"), quality=85) for p in pngs]
+        result[f"convert_image/{size}/resize-800"] = lambda jpgs=jpgs: [convert.convert_image(p, os.path.join(workdir, "small.jpg"), resize=800) for p in jpgs]
+        result[f"create_pdf/{size}"] = lambda jpgs=jpgs: create_pdf.create_pdf(jpgs, os.path.join(workdir, "out.pdf"))
+        result[f"exif/{size}"] = lambda jpgs=jpgs: [exif.exif(p) for p in jpgs]
+
+    for path in files["pdfs"]:
+        name = os.path.splitext(os.path.basename(path))[0]
+        result[f"extract_text/{name}"] = lambda path=path: extract.extract_text(path, workdir)
+
+    for query in ["LATIN SMALL LETTER A", "NO SUCH CHARACTER"]:
+        result[f"unicode_search/{query.lower().replace(' ', '-')}"] = lambda query=query: unicode.find(query, 0)
+
+    return result
+
+
+def measure(case: Callable[[], None], repeat: int) -> dict:
+    """Runs a case once to warm up, then `repeat` times, returning the median and fastest times in seconds"""
+    times = []
+    with redirect_stdout(io.StringIO()):
+        case()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            case()
+            times.append(time.perf_counter() - start)
+    return {"median": statistics.median(times), "min": min(times), "runs": repeat}
+
+
+# COMPARISON
+# ----------
+
+def compare(baseline: dict, results: dict, threshold: float) -> list[str]:
+    """Prints each case's change against the baseline, returning the names of the cases that regressed"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"  new   {name:<42} {result['median'] * 1000:9.1f} ms")
+            continue
+        change = result["median"] / before["median"] - 1
+        status = "SLOW" if change > threshold else "ok  "
+        if change > threshold:
+            regressions.append(name)
+        print(f"  {status}  {name:<42} {before['median'] * 1000:9.1f} ms -> {result['median'] * 1000:9.1f} ms  ({change:+.1%})")
+    return regressions
+
+
+def environment() -> dict:
+    """Describes what the results were measured with, since they're only comparable on the same setup"""
+    import PIL
+    import pypdf
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "pillow": PIL.__version__,
+        "pypdf": pypdf.__version__,
+        "seed": corpus.SEED,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS, help="Directory of the synthetic corpus (generated if missing)")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed runs per case (default: 5)")
+    parser.add_argument("--filter", default="", help="Only run the cases whose name contains this")
+    parser.add_argument("--save", help="Write the results to this file, to compare against later")
+    parser.add_argument("--compare", help="Compare the results against a previously saved file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown (as a fraction) that counts as a regression (default: 0.1)")
+    args = parser.parse_args()
+
+    files = corpus.ensure(args.corpus)
+
+    workdir = tempfile.mkdtemp(prefix="benchmark-")
+    try:
+        results = {}
+        for name, case in cases(files, workdir).items():
+            if args.filter in name:
+                results[name] = measure(case, args.repeat)
+                print(f"  {name:<48} {results[name]['median'] * 1000:9.1f} ms  (min {results[name]['min'] * 1000:.1f} ms)", file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != environment():
+            print("Warning: the baseline was measured in a different environment; timings may not be comparable", file=sys.stderr)
+        print(f"\nCompared to '{args.compare}' (threshold {args.threshold:.0%}):")
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+Helpers shared between the scripts. These aren't scripts themselves.
+
+Scripts add the parent `scripts/` directory to `sys.path` to import them, as each script is run on its own.
+"""
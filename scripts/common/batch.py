@@ -0,0 +1,234 @@
+"""
+Runs a per-file function over a batch of files in parallel, with progress, retries and a report of what failed (the `--jobs` option)
+"""
+
+import os
+import sys
+import time
+from collections import deque
+from typing import Any, Callable, Iterable, Literal
+
+from common.stats import stats
+
+
+# PROGRESS
+# --------
+
+class Progress:
+    """
+    A single self-overwriting status line on stderr: files done, failures, rate and ETA.
+
+    Nothing is drawn unless stderr is a terminal, so piped or redirected output stays clean.
+    The cursor is left at the start of the line, so anything the files print overwrites the status instead of trailing it.
+    """
+
+    def __init__(self, total: int, enabled: bool = True, file=sys.stderr):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.file = file
+        self.enabled = enabled and file.isatty()
+        self.started = time.perf_counter()
+        self.drawn = 0.0
+
+    def advance(self, failed: bool = False):
+        """Counts a file as finished (successfully or not), redrawing the status at most ten times a second"""
+        self.done += 1
+        self.failed += failed
+        now = time.perf_counter()
+        if self.enabled and (now - self.drawn >= 0.1 or self.done == self.total):
+            self.drawn = now
+            self.draw(now - self.started)
+
+    def draw(self, elapsed: float):
+        """Writes the status line"""
+        rate = self.done / elapsed if elapsed else 0.0
+        eta = (self.total - self.done) / rate if rate else 0.0
+        failed = f", {self.failed} failed" if self.failed else ""
+        status = f"[{self.done}/{self.total}] {self.done / self.total:.0%}{failed}  {rate:.1f} files/s  ETA {int(eta) // 60}:{int(eta) % 60:02d}"
+        self.file.write(f"\r\x1b[K{status}\r")
+        self.file.flush()
+
+    def close(self):
+        """Clears the status line"""
+        if self.enabled:
+            self.file.write("\r\x1b[K")
+            self.file.flush()
+
+
+# WORKERS
+# -------
+
+def _start_process(enabled: bool):
+    """Initializes a worker process, recording stats only if the parent is"""
+    if enabled:
+        stats.enable()
+    else:
+        stats.enabled = False
+
+
+def _attempt(function: Callable, path: str, args: tuple, kwargs: dict, retries: int, collect: bool) -> tuple[Any, str | None, int, list[dict]]:
+    """
+    Calls the function on one file, trying again up to `retries` times if it raises.
+
+    Returns its result, the last error it raised (if it never succeeded), how many tries it took, and the stats recorded for it.
+    """
+    tries = 0
+    with stats.file(path):
+        while True:
+            tries += 1
+            try:
+                result, error = function(path, *args, **kwargs), None
+                break
+            except Exception as e:
+                result, error = None, f"{type(e).__name__}: {e}"
+                if tries > retries:
+                    break
+
+    # In a worker process, hand what was recorded back to the parent to merge
+    records = []
+    if collect:
+        records, stats.files = stats.files, []
+    return result, error, tries, records
+
+
+class _Serial:
+    """Runs each call as soon as it's submitted, for batches where a pool isn't worth it"""
+
+    def submit(self, function: Callable, *args):
+        from concurrent.futures import Future
+        future = Future()
+        future.set_result(function(*args))
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        pass
+
+
+def _executor(pool: Literal["process", "thread", "serial"], jobs: int):
+    """Creates the pool to run the batch on"""
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    if pool == "process":
+        return ProcessPoolExecutor(jobs, initializer=_start_process, initargs=(stats.enabled,))
+    if pool == "thread":
+        return ThreadPoolExecutor(jobs)
+    return _Serial()
+
+
+# RUN
+# ---
+
+def run_batch(
+        function: Callable,
+        paths: Iterable[str],
+        *args,
+        jobs: int = 0,
+        pool: Literal["process", "thread", "serial"] = "process",
+        retries: int = 0,
+        progress: bool = True,
+        **kwargs,
+    ) -> tuple[list, list[dict]]:
+    """
+    Calls `function(path, *args, **kwargs)` for every path, spread over a pool of workers.
+
+    Only a couple of files per worker are in flight at a time, so memory stays bounded however large the batch.
+    An exception only fails the file that raised it; the rest of the batch carries on. If a worker process dies
+    outright (say, a crash in a native decoder), the pool is restarted and the files that were in flight are rerun one
+    at a time, so only the file that brought it down fails.
+    Each file is timed with the shared `stats`, including in worker processes.
+
+    #### Parameters:
+        `function (Callable)`: The function to call on each file. For a process pool, it (and its arguments and result) must be picklable.
+        `paths (Iterable[str])`: The files to process.
+        `jobs (int)`: The number of workers to use (0 for one per CPU core, 1 to run everything in this thread).
+        `pool (Literal["process", "thread", "serial"])`: Processes for CPU-bound work in Python, threads for I/O or for work that releases the GIL.
+        `retries (int)`: How many more times to try a file that failed.
+        `progress (bool)`: Show progress and an ETA on stderr (only when it's a terminal).
+
+    #### Returns:
+        `tuple[list, list[dict]]`: The results in the order of `paths` (`None` for files that failed), and a `{"path", "error", "attempts"}` record for each file that failed.
+    """
+    from concurrent.futures import wait, FIRST_COMPLETED
+    from concurrent.futures.process import BrokenProcessPool
+
+    paths = list(paths)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(paths) <= 1:
+        pool = "serial"
+    collect = pool == "process"
+
+    results = [None] * len(paths)
+    attempts = [0] * len(paths)
+    failures = {}
+    waiting = deque(range(len(paths)))
+    isolated = deque()
+    pending = {}
+    status = Progress(len(paths), enabled=progress)
+    executor = _executor(pool, jobs)
+
+    def submit(index: int):
+        pending[executor.submit(_attempt, function, paths[index], args, kwargs, retries - attempts[index], collect)] = index
+
+    try:
+        while waiting or isolated or pending:
+            # Keep a couple of files per worker in flight, unless looking for the file that killed a worker
+            if isolated:
+                if not pending:
+                    submit(isolated.popleft())
+            while waiting and not isolated and len(pending) < jobs * 2:
+                submit(waiting.popleft())
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            # When a worker process dies, the whole pool goes down with everything in flight
+            broken = any(isinstance(future.exception(), BrokenProcessPool) for future in done)
+            if broken:
+                done = wait(pending).done
+            crashed = sum(isinstance(future.exception(), BrokenProcessPool) for future in done)
+
+            for future in done:
+                index = pending.pop(future)
+                if isinstance(future.exception(), BrokenProcessPool):
+                    # There's no telling which of several files was to blame, so rerun each on its own
+                    if crashed > 1:
+                        isolated.append(index)
+                        continue
+                    # Otherwise it was alone in the pool, so it's to blame
+                    attempts[index] += 1
+                    if attempts[index] <= retries:
+                        isolated.append(index)
+                        continue
+                    result, error, tries, records = None, "The worker process died unexpectedly", 0, []
+                else:
+                    result, error, tries, records = future.result()
+
+                attempts[index] += tries
+                for record in records:
+                    stats.add(record)
+
+                if error is None:
+                    results[index] = result
+                    status.advance()
+                else:
+                    failures[index] = {"path": paths[index], "error": error, "attempts": attempts[index]}
+                    status.advance(failed=True)
+
+            if broken:
+                executor.shutdown(wait=False)
+                executor = _executor(pool, jobs)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        status.close()
+
+    return results, [failures[index] for index in sorted(failures)]
+
+
+def report_failures(failures: list[dict], file=sys.stderr):
+    """Prints which files failed and why, if any did"""
+    if not failures:
+        return
+
+    print(f"\nFailed to process {len(failures)} file(s):", file=file)
+    for failure in failures:
+        retried = f" (after {failure['attempts']} attempts)" if failure["attempts"] > 1 else ""
+        print(f"  {failure['path']}: {failure['error']}{retried}", file=file)
@@ -0,0 +1,184 @@
+"""
+Per-stage timings, throughput and profiling for the file-processing scripts (the `--stats` and `--profile` options)
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Literal
+
+
+# STATS
+# -----
+
+class Stats:
+    """
+    Records how long each stage of processing each file takes, and the overall throughput.
+
+    While disabled (the default) nothing is recorded, so processing code can be instrumented unconditionally:
+
+        with stats.file(path):
+            with stats.stage("decode"):
+                ...
+            stats.count(pages=1)
+
+    Stages timed outside of any file (e.g. writing one output assembled from many inputs) are attributed to the batch as a whole.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.files: list[dict] = []
+        self.batch = self._record(None)
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @staticmethod
+    def _record(path: str | None) -> dict:
+        """Creates an empty record for a file"""
+        return {"path": path, "seconds": 0.0, "bytes": 0, "pages": 0, "stages": {}}
+
+    def enable(self):
+        """Starts recording a new batch, discarding anything recorded before"""
+        self.enabled = True
+        self.files = []
+        self.batch = self._record(None)
+        self.started = time.perf_counter()
+
+    @property
+    def current(self) -> dict:
+        """The record of the file being processed on this thread, or the batch record outside of any file"""
+        return getattr(self.local, "record", None) or self.batch
+
+    @contextmanager
+    def file(self, path: str):
+        """Times the processing of an input file, counting its size towards the throughput"""
+        if not self.enabled:
+            yield
+            return
+
+        record = self._record(path)
+        record["bytes"] = os.path.getsize(path) if os.path.isfile(path) else 0
+        self.local.record = record
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            self.local.record = None
+            self.add(record)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Times a stage of processing (like `decode` or `write`), adding to any earlier time spent in the same stage"""
+        if not self.enabled:
+            yield
+            return
+
+        record = self.current
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                record["stages"][name] = record["stages"].get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, pages: int = 0):
+        """Counts pages processed for the current file"""
+        if self.enabled:
+            with self.lock:
+                self.current["pages"] += pages
+
+    def add(self, record: dict):
+        """Adds a finished file record (possibly recorded in another process)"""
+        with self.lock:
+            self.files.append(record)
+
+    def summary(self) -> dict:
+        """Summarizes the per-file records into stage totals, throughput and peak memory use"""
+        elapsed = time.perf_counter() - self.started
+        files = self.files
+        pages = sum(f["pages"] for f in files) + self.batch["pages"]
+        megabytes = sum(f["bytes"] for f in files) / 1e6
+
+        stages: dict[str, float] = {}
+        for record in [*files, self.batch]:
+            for name, seconds in record["stages"].items():
+                stages[name] = stages.get(name, 0.0) + seconds
+
+        return {
+            "elapsed": elapsed,
+            "files": len(files),
+            "pages": pages,
+            "megabytes": megabytes,
+            "files_per_second": len(files) / elapsed if elapsed else None,
+            "pages_per_second": pages / elapsed if elapsed else None,
+            "megabytes_per_second": megabytes / elapsed if elapsed else None,
+            "peak_rss_megabytes": peak_rss_megabytes(),
+            "stages": stages,
+            "per_file": files,
+        }
+
+    def report(self, format: Literal["text", "json"] = "text", file=sys.stderr):
+        """Prints the summary, either as a human-readable table or as JSON"""
+        summary = self.summary()
+        if format == "json":
+            print(json.dumps(summary, indent=2), file=file)
+            return
+
+        print(f"\nProcessed {summary['files']} files ({summary['pages']} pages, {summary['megabytes']:.1f} MB) in {summary['elapsed']:.2f}s", file=file)
+        print(f"  Throughput:   {summary['files_per_second']:.2f} files/s, {summary['pages_per_second']:.2f} pages/s, {summary['megabytes_per_second']:.2f} MB/s", file=file)
+        if summary["peak_rss_megabytes"] is not None:
+            print(f"  Peak RSS:     {summary['peak_rss_megabytes']:.1f} MB", file=file)
+        for name, seconds in sorted(summary["stages"].items(), key=lambda stage: stage[1], reverse=True):
+            print(f"  {name + ':':<14}{seconds:.3f}s", file=file)
+
+
+def peak_rss_megabytes() -> float | None:
+    """Returns the peak resident memory of this process and its children, or `None` where it can't be measured"""
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+# The stats shared by everything running in this process
+stats = Stats()
+
+
+# INSTRUMENT
+# ----------
+
+@contextmanager
+def instrument(format: Literal["text", "json"] | None = None, profile: str | None = None):
+    """
+    Enables the shared stats and/or cProfile for the duration of a batch, reporting them at the end.
+
+    #### Parameters:
+        `format (Literal["text", "json"] | None)`: Print the stats summary to stderr in this format, or `None` to not collect stats.
+        `profile (str | None)`: Write a cProfile dump (readable with `pstats` or `snakeviz`) to this path.
+    """
+    if format:
+        stats.enable()
+
+    profiler = None
+    if profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        yield stats
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile)
+        if format:
+            stats.report(format)
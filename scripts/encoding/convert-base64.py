@@ -11,28 +11,117 @@ Encode and decode data with Base64
 # ]
 # ///
 
+import io
 import sys
-import base64
+import math
+import binascii
+import contextlib
+from typing import BinaryIO
 from defcmd import CLI
 
 
+# Number of bytes read per step when streaming. Encoding reads a multiple of 3 bytes
+# (so no chunk but the last needs padding) and decoding keeps a multiple of 4 characters.
+CHUNK_SIZE = 3 * 1024 * 1024
+
+WHITESPACE = b" \t\r\n\v\f"
+TO_URL_SAFE = bytes.maketrans(b"+/", b"-_")
+FROM_URL_SAFE = bytes.maketrans(b"-_", b"+/")
+
+
+# STREAMING
+# ---------
+
+def open_input(path: str):
+    """Opens a file (or stdin, if the path is `-`) for reading bytes"""
+    if path == "-":
+        return contextlib.nullcontext(sys.stdin.buffer)
+    return open(path, "rb")
+
+
+def encode_stream(src: BinaryIO, dst: BinaryIO, url_safe: bool = False, wrap: int = 0):
+    """
+    Encodes a stream of bytes in Base64, chunk by chunk, using constant memory.
+
+    #### Parameters:
+        `src (BinaryIO)`: The stream to read raw bytes from.
+        `dst (BinaryIO)`: The stream to write the Base64 text to.
+        `url_safe (bool)`: Use the URL-safe alphabet (`-` and `_` instead of `+` and `/`).
+        `wrap (int)`: Wrap the output into lines of this many characters (0 to disable).
+    """
+
+    # Each chunk must encode to whole lines, so that wrapping never straddles two chunks
+    step = 3 * math.lcm(4, wrap) // 4 if wrap else 3
+    size = max(step, CHUNK_SIZE // step * step)
+
+    while chunk := src.read(size):
+        encoded = binascii.b2a_base64(chunk, newline=False)
+        if url_safe:
+            encoded = encoded.translate(TO_URL_SAFE)
+        if wrap:
+            dst.write(b"\n".join(encoded[i:i + wrap] for i in range(0, len(encoded), wrap)))
+            dst.write(b"\n")
+        else:
+            dst.write(encoded)
+
+    if not wrap:
+        dst.write(b"\n")
+
+
+def decode_stream(src: BinaryIO, dst: BinaryIO, url_safe: bool = False):
+    """
+    Decodes a stream of Base64 text, chunk by chunk, using constant memory.
+
+    Whitespace (including line breaks) anywhere in the input is ignored, and missing padding is tolerated.
+
+    #### Parameters:
+        `src (BinaryIO)`: The stream to read Base64 text from.
+        `dst (BinaryIO)`: The stream to write the raw bytes to.
+        `url_safe (bool)`: Expect the URL-safe alphabet (`-` and `_` instead of `+` and `/`).
+
+    #### Errors:
+        `binascii.Error`: If the input contains characters outside the Base64 alphabet or is truncated.
+    """
+
+    # Characters left over from the previous chunk, that didn't make up a full group of 4
+    pending = b""
+
+    while chunk := src.read(CHUNK_SIZE):
+        chunk = pending + chunk.translate(None, WHITESPACE)
+        if url_safe:
+            chunk = chunk.translate(FROM_URL_SAFE)
+        usable = len(chunk) - len(chunk) % 4
+        dst.write(binascii.a2b_base64(memoryview(chunk)[:usable], strict_mode=True))
+        pending = chunk[usable:]
+
+    if pending:
+        dst.write(binascii.a2b_base64(pending + b"=" * (-len(pending) % 4), strict_mode=True))
+
+
+# CLI
+# ---
+
 cli = CLI(description=__doc__)
 
 @cli.subcmd(aliases=["enc"], prompt_optional=False)
-def encode(data: str, url_safe: bool = False):
-    """Encode data in Base64"""
-    bytes = data.encode('utf-8')
-    encoder = base64.urlsafe_b64encode if url_safe else base64.b64encode
-    encoded_data = encoder(bytes).decode('utf-8')
-    print(encoded_data)
+def encode(data: str, url_safe: bool = False, file: bool = False, wrap: int = 0):
+    """Encode data in Base64 (pass `-` to read stdin, or --file to read data as a file path)"""
+    if file or data == "-":
+        with open_input(data) as src:
+            encode_stream(src, sys.stdout.buffer, url_safe, wrap)
+        return
+
+    encode_stream(io.BytesIO(data.encode('utf-8')), sys.stdout.buffer, url_safe, wrap)
 
 @cli.subcmd(aliases=["dec"], prompt_optional=False)
-def decode(data: str, url_safe: bool = False):
-    """Decode Base64 data"""
-    bytes = data.encode('utf-8')
-    decoder = base64.urlsafe_b64decode if url_safe else base64.b64decode
-    decoded_data = decoder(bytes).decode('utf-8')
-    print(decoded_data)
+def decode(data: str, url_safe: bool = False, file: bool = False):
+    """Decode Base64 data (pass `-` to read stdin, or --file to read data as a file path)"""
+    if file or data == "-":
+        with open_input(data) as src:
+            decode_stream(src, sys.stdout.buffer, url_safe)
+        return
+
+    decode_stream(io.BytesIO(data.encode('utf-8')), sys.stdout.buffer, url_safe)
 
 
 if __name__ == "__main__":
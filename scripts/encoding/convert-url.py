@@ -11,23 +11,117 @@ URL encode and decode data
 # ]
 # ///
 
+import io
+import os
+import sys
+import json
+import itertools
 import urllib.parse
+from collections import deque
+from typing import TextIO
 from defcmd import CLI
 
 
+# Number of lines converted per chunk when streaming
+CHUNK_LINES = 10_000
+
+# Invalid UTF-8 in the input (common in access logs) is carried through byte for byte
+ERRORS = "surrogateescape"
+
+
+# CONVERSIONS
+# -----------
+
+def parse_query(line: str) -> str:
+    """Parses the query string of a URL (or a bare query string) into a JSON object of lists"""
+    query = line.split("?", 1)[1] if "?" in line else line
+    query = query.split("#", 1)[0]
+    return json.dumps(urllib.parse.parse_qs(query, keep_blank_values=True, errors=ERRORS), ensure_ascii=False)
+
+
+OPERATIONS = {
+    "encode":      lambda s: urllib.parse.quote(s, errors=ERRORS),
+    "encode_plus": lambda s: urllib.parse.quote_plus(s, errors=ERRORS),
+    "decode":      lambda s: urllib.parse.unquote(s, errors=ERRORS),
+    "decode_plus": lambda s: urllib.parse.unquote_plus(s, errors=ERRORS),
+    "query":       parse_query,
+}
+
+
+# STREAMING
+# ---------
+
+def convert_lines(operation: str, lines: list[str]) -> str:
+    """Applies an operation to each line, returning the converted lines as one newline-terminated string"""
+    convert = OPERATIONS[operation]
+    return "".join(convert(line.rstrip("\r\n")) + "\n" for line in lines)
+
+
+def convert_stream(src: TextIO, dst: TextIO, operation: str, jobs: int = 1):
+    """
+    Applies an operation to every line of a stream, writing the results in input order.
+
+    Lines are converted in chunks of `CHUNK_LINES`. With more than one job, chunks are spread over a
+    pool of worker processes, with only a few chunks per worker in flight to keep memory bounded.
+
+    #### Parameters:
+        `src (TextIO)`: The stream to read newline-delimited input from.
+        `dst (TextIO)`: The stream to write the converted lines to.
+        `operation (str)`: The name of the conversion to apply (one of `OPERATIONS`).
+        `jobs (int)`: The number of worker processes to use (0 for one per CPU core).
+    """
+    chunks = iter(lambda: list(itertools.islice(src, CHUNK_LINES)), [])
+    jobs = jobs or os.cpu_count() or 1
+
+    if jobs == 1:
+        for chunk in chunks:
+            dst.write(convert_lines(operation, chunk))
+        return
+
+    import multiprocessing
+
+    with multiprocessing.Pool(jobs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(convert_lines, (operation, chunk)))
+            if len(pending) >= jobs * 2:
+                dst.write(pending.popleft().get())
+        while pending:
+            dst.write(pending.popleft().get())
+
+
+def run(operation: str, data: str, file: bool, jobs: int):
+    """Converts a single string, or every line of a file (or stdin, for `-`)"""
+    if not file and data != "-":
+        print(OPERATIONS[operation](data))
+        return
+
+    sys.stdout.reconfigure(errors=ERRORS)
+    raw = sys.stdin.buffer if data == "-" else open(data, "rb")
+    # Only `\n` ends a line: a stray `\r` inside a line (as in some logs) mustn't split it and misalign the output
+    with io.TextIOWrapper(raw, encoding="utf-8", errors=ERRORS, newline="\n") as src:
+        convert_stream(src, sys.stdout, operation, jobs)
+
+
+# CLI
+# ---
+
 cli = CLI(description=__doc__)
 
 @cli.subcmd
-def encode(data: str):
-    """URL encode data"""
-    encoded_data = urllib.parse.quote(data)
-    print(encoded_data)
+def encode(data: str, plus: bool = False, file: bool = False, jobs: int = 1):
+    """URL encode data (pass `-` to convert each line of stdin, or --file to convert each line of a file)"""
+    run("encode_plus" if plus else "encode", data, file, jobs)
+
+@cli.subcmd
+def decode(data: str, plus: bool = False, file: bool = False, jobs: int = 1):
+    """URL decode data (pass `-` to convert each line of stdin, or --file to convert each line of a file)"""
+    run("decode_plus" if plus else "decode", data, file, jobs)
 
 @cli.subcmd
-def decode(data: str):
-    """URL decode data"""
-    decoded_data = urllib.parse.unquote(data)
-    print(decoded_data)
+def query(data: str, file: bool = False, jobs: int = 1):
+    """Parse query strings into JSON (pass `-` to parse each line of stdin, or --file to parse each line of a file)"""
+    run("query", data, file, jobs)
 
 
 if __name__ == "__main__":
@@ -10,17 +10,278 @@ A script to list serial ports and identify potential ESP32 devices.
 # ///
 
 # Library
+import serial
 from serial.tools.list_ports import comports
+import os
 import sys
+import json
+import time
+import struct
+import argparse
+
+# The sysfs root can be overridden, e.g. to point at a fake tree
+SYSFS = os.environ.get("FIND_ESP32_SYSFS", "/sys")
+
+# Only these tty devices can be USB-to-serial adapters (or native USB serial)
+TTY_PREFIXES = ("ttyUSB", "ttyACM", "ttyXRUSB", "ttyAMA")
+
+# USB-to-UART bridges commonly found on ESP32 boards, and Espressif's own native USB
+ESP32_CHIPS = ("CP210", "CH340", "CH910")
+ESP32_VENDORS = ("10c4", "1a86", "303a")
+
+
+def is_likely_esp32(info: dict) -> bool:
+    """Guesses whether a port belongs to an ESP32, from its description or USB vendor ID"""
+    description = info.get("description") or ""
+    return any(chip in description for chip in ESP32_CHIPS) or info.get("vid") in ESP32_VENDORS
+
+
+def port_info(port) -> dict:
+    """Describes a port as reported by pyserial's `comports()`"""
+    info = {
+        "device": port.device,
+        "description": port.description,
+        "vid": f"{port.vid:04x}" if port.vid is not None else None,
+        "pid": f"{port.pid:04x}" if port.pid is not None else None,
+    }
+    info["likely_esp32"] = is_likely_esp32(info)
+    return info
+
+# SYSFS
+# -----
+
+def scan(root: str = SYSFS) -> set[str]:
+    """
+    Returns the names of the serial tty devices currently present in sysfs.
+
+    Only the directory listing of `class/tty` is read, and only names that can be serial adapters are kept,
+    so a scan costs a single syscall no matter how many ports are attached.
+    """
+    try:
+        return {name for name in os.listdir(os.path.join(root, "class", "tty")) if name.startswith(TTY_PREFIXES)}
+    except FileNotFoundError:
+        return set()
+
+
+def read_attribute(path: str) -> str | None:
+    """Reads a sysfs attribute file, returning `None` if it doesn't exist"""
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def describe(name: str, root: str = SYSFS) -> dict:
+    """Describes a tty device from its sysfs entry (USB vendor, product and description)"""
+    device_dir = os.path.realpath(os.path.join(root, "class", "tty", name, "device"))
+
+    # Walk up from the tty (or its USB interface) to the USB device, which holds the vendor and product details
+    usb_dir = device_dir
+    for _ in range(3):
+        if os.path.exists(os.path.join(usb_dir, "idVendor")):
+            break
+        usb_dir = os.path.dirname(usb_dir)
+
+    info = {
+        "device": f"/dev/{name}",
+        "description": read_attribute(os.path.join(usb_dir, "product")) or name,
+        "vid": read_attribute(os.path.join(usb_dir, "idVendor")),
+        "pid": read_attribute(os.path.join(usb_dir, "idProduct")),
+    }
+    info["likely_esp32"] = is_likely_esp32(info)
+    return info
+
+# OUTPUT
+# ------
+
+def print_port(info: dict, prefix: str = ""):
+    """Prints a port in the human-readable format"""
+    print(f"{prefix}{info['device']} - {info['description']}", end="")
+    if info["likely_esp32"]:
+        print("    🌟 Likely ESP32!", end="")
+    print(flush=True)
+
+
+def emit(event: str, info: dict, as_json: bool):
+    """Reports a port being attached or detached"""
+    if as_json:
+        print(json.dumps({"event": event, "time": time.time(), **info}), flush=True)
+    else:
+        print_port(info, prefix="+ " if event == "attach" else "- ")
+
+# WATCH
+# -----
+
+def watch(interval: float, as_json: bool, root: str = SYSFS):
+    """
+    Watches for serial ports being attached and detached, until interrupted.
+
+    On Linux, each poll lists the serial entries in sysfs and diffs them against the previous poll,
+    so only newly attached devices are ever inspected. Elsewhere, it falls back to diffing `comports()`.
+    Ports present when the watch starts are reported as attached.
+    """
+    use_sysfs = os.path.isdir(os.path.join(root, "class", "tty"))
+    known: dict[str, dict] = {}
+
+    while True:
+        if use_sysfs:
+            current = scan(root)
+            attached = {name: describe(name, root) for name in current - known.keys()}
+        else:
+            ports = {port.device: port_info(port) for port in comports()}
+            current = ports.keys()
+            attached = {device: ports[device] for device in current - known.keys()}
+
+        for key in sorted(known.keys() - current):
+            emit("detach", known.pop(key), as_json)
+        for key in sorted(attached):
+            known[key] = attached[key]
+            emit("attach", attached[key], as_json)
+
+        time.sleep(interval)
+
+# PROBE
+# -----
+
+def slip_encode(packet: bytes) -> bytes:
+    """Frames a packet with SLIP, as the ESP32 ROM bootloader expects"""
+    return b"\xc0" + packet.replace(b"\xdb", b"\xdb\xdd").replace(b"\xc0", b"\xdb\xdc") + b"\xc0"
+
+
+def slip_decode(frame: bytes) -> bytes:
+    """Undoes the SLIP escaping of a frame's contents"""
+    return frame.replace(b"\xdb\xdc", b"\xc0").replace(b"\xdb\xdd", b"\xdb")
+
+
+# The ROM bootloader's SYNC command: direction 0 (request), opcode 0x08, 36 bytes of data, no checksum
+SYNC_COMMAND = 0x08
+SYNC_PACKET = slip_encode(struct.pack("<BBHI", 0x00, SYNC_COMMAND, 36, 0) + b"\x07\x07\x12\x20" + b"\x55" * 32)
+
+
+def is_sync_response(frame: bytes) -> bool:
+    """Checks whether a (decoded) frame is the bootloader's response to a SYNC command"""
+    return len(frame) >= 8 and frame[0] == 0x01 and frame[1] == SYNC_COMMAND
+
+
+def reset_into_bootloader(port: serial.Serial) -> bool:
+    """
+    Resets the chip into its ROM bootloader by toggling DTR and RTS (wired to IO0 and EN on most boards).
+
+    Ports without modem control lines (like pseudo-terminals) can't be reset, and are probed as they are.
+    Returns whether the lines were toggled, in which case the chip must be reset back with `hard_reset`.
+    """
+    toggled = False
+    try:
+        port.dtr = False
+        port.rts = True   # EN low: hold the chip in reset
+        toggled = True
+        time.sleep(0.1)
+        port.dtr = True
+        port.rts = False  # EN high, IO0 low: boot into the bootloader
+        time.sleep(0.05)
+        port.dtr = False
+    except (OSError, serial.SerialException):
+        pass
+    port.reset_input_buffer()
+    return toggled
+
+
+def hard_reset(port: serial.Serial):
+    """Resets the chip back into its application after probing"""
+    try:
+        port.rts = True
+        time.sleep(0.1)
+        port.rts = False
+    except (OSError, serial.SerialException):
+        pass
+
+
+def probe(device: str, timeout: float, baudrate: int = 115200) -> dict:
+    """
+    Attempts the ROM bootloader sync handshake on a port.
+
+    The SYNC command is resent every 100ms until the bootloader answers or `timeout` seconds have passed.
+
+    #### Returns:
+        `dict`: The `device`, whether the bootloader was `confirmed`, the handshake `latency` in seconds, and any `error`.
+    """
+    result = {"device": device, "confirmed": False, "latency": None, "error": None}
+    try:
+        with serial.Serial(device, baudrate, timeout=0.1, write_timeout=timeout) as port:
+            toggled = reset_into_bootloader(port)
+            try:
+                start = time.monotonic()
+                deadline = start + timeout
+                buffer = b""
+                while time.monotonic() < deadline and not result["confirmed"]:
+                    port.write(SYNC_PACKET)
+
+                    # Collect whatever arrives in the next 100ms, and look for a complete response frame
+                    resend = min(deadline, time.monotonic() + 0.1)
+                    while time.monotonic() < resend:
+                        buffer += port.read(port.in_waiting or 1)
+                        *frames, buffer = buffer.split(b"\xc0")
+                        if any(is_sync_response(slip_decode(frame)) for frame in frames):
+                            result["confirmed"] = True
+                            result["latency"] = time.monotonic() - start
+                            break
+
+                if not result["confirmed"]:
+                    result["error"] = "no response"
+            finally:
+                # Whether or not it answered, don't leave whatever board this is stuck in its bootloader
+                if toggled:
+                    hard_reset(port)
+    except (OSError, serial.SerialException) as e:
+        result["error"] = str(e)
+    return result
+
+
+def probe_all(devices: list[str], timeout: float) -> list[dict]:
+    """Probes all the ports at the same time, one thread per port, returning the results in the same order"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not devices:
+        return []
+    with ThreadPoolExecutor(max_workers=len(devices)) as executor:
+        return list(executor.map(lambda device: probe(device, timeout), devices))
+
+# MAIN
+# ----
 
 if __name__ == "__main__":
-    if '--help' in sys.argv or '-h' in sys.argv:
-        print(__doc__)
-        sys.exit(0)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--watch", action="store_true", help="Keep running and report ports as they are attached and detached")
+    parser.add_argument("--interval", type=float, default=0.25, help="Seconds between polls in watch mode (default: 0.25)")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per port (or event) instead of text")
+    parser.add_argument("--probe", action="store_true", help="Confirm ESP32s by talking to their ROM bootloader (resets the chips)")
+    parser.add_argument("--timeout", type=float, default=1.0, help="Seconds to wait for each port to answer in probe mode (default: 1.0)")
+    parser.add_argument("ports", nargs="*", help="Ports to probe (default: all USB serial ports)")
+    args = parser.parse_args()
 
-    for port in comports():
-        # ? Maybe show other information from port
-        print(f"{port.device} - {port.description}", end="")
-        if "CP210" in port.description or "CH340" in port.description:
-            print("    🌟 Likely ESP32!")
-        print()
+    try:
+        if args.watch:
+            watch(args.interval, args.json)
+            sys.exit(0)
+
+        if args.probe:
+            devices = args.ports or [port.device for port in comports() if port.vid is not None]
+            for result in probe_all(devices, args.timeout):
+                if args.json:
+                    print(json.dumps(result))
+                elif result["confirmed"]:
+                    print(f"{result['device']} - ✅ ESP32 bootloader confirmed ({result['latency'] * 1000:.0f} ms)")
+                else:
+                    print(f"{result['device']} - ❌ {result['error']}")
+            sys.exit(0)
+
+        for port in comports():
+            info = port_info(port)
+            if args.json:
+                print(json.dumps(info))
+            else:
+                # ? Maybe show other information from port
+                print_port(info)
+    except KeyboardInterrupt:
+        sys.exit(0)
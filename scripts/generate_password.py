@@ -11,12 +11,149 @@ Generate cryptographically secure passwords
 # ]
 # ///
 
+import os
 import sys
-import secrets
+import struct
+import hashlib
+import itertools
 from string import ascii_letters, digits, punctuation
 from defcmd import cmd, Spec
 
-from typing import Annotated
+from typing import Annotated, Iterator
+
+# Number of passwords generated at once. Larger blocks amortize the per-block overhead over more passwords.
+BLOCK_SIZE = 4096
+
+
+# RANDOM CHARACTERS
+# -----------------
+
+def random_chars(alphabet: bytes, n: int) -> bytes:
+    """
+    Returns `n` characters drawn uniformly at random from the alphabet.
+
+    Random bytes are drawn from `os.urandom` in bulk and mapped onto the alphabet with `bytes.translate`.
+    To keep the mapping unbiased, bytes at or above the largest multiple of the alphabet size are rejected
+    (deleted by the same `translate` call) and replaced with fresh ones.
+    """
+    size = len(alphabet)
+    limit = 256 - 256 % size
+    table = bytes(alphabet[b % size] for b in range(256))
+    rejected = bytes(range(limit, 256))
+
+    chars = bytearray()
+    while len(chars) < n:
+        # Draw a little more than needed to make up for the rejected bytes
+        needed = n - len(chars)
+        chars += os.urandom(needed * 256 // limit + 16).translate(table, rejected)
+    return bytes(chars[:n])
+
+
+# UNIQUENESS
+# ----------
+
+class UniqueFilter:
+    """
+    Remembers which passwords have been generated, usually in about 2 bytes per password, using a Bloom filter.
+
+    A Bloom filter never forgets a password it has seen, so duplicates are always caught. Rarely (about 0.2%
+    of the time at full capacity) a new password is mistaken for a seen one, and can then never be generated.
+    That's harmless while the passwords wanted are a small fraction of all possible ones, but ruling out even
+    one could make it impossible to finish when nearly all of them are wanted. So above `1 / EXACT_RATIO` of
+    the keyspace, passwords are remembered exactly in a set instead.
+    """
+
+    BITS_PER_ITEM = 16
+    EXACT_RATIO = 100
+
+    def __init__(self, capacity: int, keyspace: int):
+        self.exact = set() if capacity * self.EXACT_RATIO > keyspace else None
+        self.size = max(64, capacity * self.BITS_PER_ITEM) if self.exact is None else 0
+        self.bits = bytearray(self.size // 8 + 1)
+
+    def add(self, item: bytes) -> bool:
+        """Adds an item to the filter, returning `True` if it definitely wasn't there before"""
+        if self.exact is not None:
+            if item in self.exact:
+                return False
+            self.exact.add(item)
+            return True
+
+        new = False
+        for h in struct.unpack("<4I", hashlib.blake2b(item, digest_size=16).digest()):
+            i = h % self.size
+            if not self.bits[i >> 3] & (1 << (i & 7)):
+                self.bits[i >> 3] |= 1 << (i & 7)
+                new = True
+        return new
+
+
+# KEYSPACE
+# --------
+
+def count_passwords(alphabet: bytes, classes: list[bytes], length: int) -> int:
+    """
+    Counts the distinct passwords of the given length that include a character from every required class.
+
+    By inclusion-exclusion: all passwords, minus those missing each class, plus those missing each pair of classes, and so on.
+    """
+    total = 0
+    for k in range(len(classes) + 1):
+        for missing in itertools.combinations(classes, k):
+            allowed = set(alphabet).difference(*missing)
+            total += (-1) ** k * len(allowed) ** length
+    return total
+
+
+# GENERATE
+# --------
+
+def generate_passwords(char_set: str, length: int, count: int, required: list[str] | None = None, unique: bool = False) -> Iterator[bytes]:
+    """
+    Generates passwords in blocks, yielding each block as newline-terminated bytes ready to be written out.
+
+    #### Parameters:
+        `char_set (str)`: The characters to draw from.
+        `length (int)`: The length of each password.
+        `count (int)`: The total number of passwords to generate.
+        `required (list[str] | None)`: Character classes that must each appear at least once in every password.
+        `unique (bool)`: Guarantee that no password is generated twice.
+
+    #### Errors:
+        `ValueError`: If the requirements can't be satisfied with the given length and count.
+    """
+    alphabet = char_set.encode("ascii")
+    classes = [c.encode("ascii") for c in required or []]
+
+    if length < 1:
+        raise ValueError("Passwords must be at least 1 character long")
+    if length < len(classes):
+        raise ValueError(f"Passwords must be at least {len(classes)} characters long to include every required character class")
+    keyspace = count_passwords(alphabet, classes, length)
+    if keyspace == 0 and count > 0:
+        raise ValueError("No password can include every required character class with this character set")
+    if unique and count > keyspace:
+        raise ValueError(f"Cannot generate {count} unique passwords of length {length} (there are only {keyspace})")
+
+    seen = UniqueFilter(count, keyspace) if unique else None
+
+    remaining = count
+    while remaining > 0:
+        n = min(remaining, BLOCK_SIZE)
+        chars = random_chars(alphabet, n * length)
+        passwords = [chars[i:i + length] for i in range(0, n * length, length)]
+
+        # Reject passwords that miss a required class (deleting the class's characters leaves it intact)
+        if classes:
+            passwords = [p for p in passwords if all(len(p.translate(None, c)) < length for c in classes)]
+
+        # Reject passwords that have been generated before
+        if seen is not None:
+            passwords = [p for p in passwords if seen.add(p)]
+
+        if passwords:
+            remaining -= len(passwords)
+            yield b"\n".join(passwords) + b"\n"
 
 @cmd(prompt_optional=False)
 def generate_password(
@@ -40,20 +177,34 @@ def generate_password(
         help="Include symbols in the password",
         short="s",
     )] = True,
+
+    require: Annotated[bool, Spec(
+        help="Require at least one character from each enabled class",
+        short="r",
+    )] = False,
+
+    unique: Annotated[bool, Spec(
+        help="Guarantee that all generated passwords are distinct",
+        short="u",
+    )] = False,
 ):
     """Generate cryptographically secure passwords."""
 
     # Define the character set based on user preferences
     char_set = ascii_letters
+    classes = [ascii_letters]
     if numbers:
         char_set += digits
+        classes.append(digits)
     if symbols:
         char_set += punctuation
+        classes.append(punctuation)
 
-    # Generate the specified number of passwords
-    for _ in range(count):
-        password = ''.join(secrets.choice(char_set) for _ in range(length))
-        print(password)
+    # Generate the specified number of passwords, writing them out a block at a time
+    output = sys.stdout.buffer
+    for block in generate_passwords(char_set, length, count, classes if require else None, unique):
+        output.write(block)
+    output.flush()
 
 
 if __name__ == "__main__":
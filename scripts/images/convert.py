@@ -15,13 +15,15 @@ A script to convert images from one format to another, with options for resizing
 # Library
 import os
 import sys
-from defcmd import cmd, Spec
 import glob
 
-from PIL import Image
-
 from typing import Literal, Annotated
 
+# Shared helpers live in `scripts/common`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.stats import stats, instrument
+from common.batch import run_batch, report_failures
+
 # CONVERT IMAGE
 # -------------
 
@@ -42,6 +44,8 @@ def convert_image(input: str, output: str, resize: int | None = None, quality: i
         Propagate exceptions from the Pillow library or file system operations to be handled by the caller.
     """
 
+    from PIL import Image
+
     # Check if the input path actually exists
     if not os.path.exists(input):
         raise FileNotFoundError(f"Input file not found at '{input}'")
@@ -53,82 +57,107 @@ def convert_image(input: str, output: str, resize: int | None = None, quality: i
 
     # Perform the conversion
     with Image.open(input) as img:
+        with stats.stage("decode"):
+            img.load()
+
         # Resize the image if a width is provided
         if resize:
-            width, height = img.size
-            aspect_ratio = height / width
-            new_width = resize
-            new_height = int(new_width * aspect_ratio)
-            img = img.resize((new_width, new_height))
-
-        print(f"Converting '{input}' to '{output}'... ", end="")
+            with stats.stage("resize"):
+                width, height = img.size
+                aspect_ratio = height / width
+                new_width = resize
+                new_height = int(new_width * aspect_ratio)
+                img = img.resize((new_width, new_height))
 
         # Set quality if provided (for JPEG)
-        if quality and output.lower().endswith(('.jpg', '.jpeg')):
-            img.save(output, quality=quality)
-        else:
-            img.save(output)
+        with stats.stage("encode"):
+            if quality and output.lower().endswith(('.jpg', '.jpeg')):
+                img.save(output, quality=quality)
+            else:
+                img.save(output)
+
+        # Printed in one go, so lines from parallel conversions don't interleave
+        print(f"Converting '{input}' to '{output}'... ☑️")
 
-        print("☑️")
+
+def convert_into(input: str, output_dir: str, format: str, resize: int | None = None, quality: int | None = None):
+    """
+    Converts an image into a directory, keeping its name but changing its extension to the format.
+
+    #### Parameters:
+        `input (str)`: Path to the input image file.
+        `output_dir (str)`: The directory to save the converted image in.
+        `format (str)`: The output format (e.g. `png`), used as the extension.
+        `resize (int | None)`: The width to resize the image to (maintaining aspect ratio).
+        `quality (int | None)`: Set the quality of the output image (1-100, for JPG/JPEG).
+    """
+    filename, _ = os.path.splitext(os.path.basename(input))
+    convert_image(input, os.path.join(output_dir, f"{filename}.{format}"), resize, quality)
 
 # MAIN
 # ----
 
-@cmd(epilog="Example: python scripts/images/convert.py 'images/*.jpg' 'converted/' --format png --resize 800 --quality 85")
-def main(
-        input: Annotated[str, Spec(help="Path to the input image file or a glob pattern for multiple files.")],
-        output: Annotated[str, Spec(help="Path to save the converted image or a directory for bulk conversion.")],
-        format: Annotated[Literal["png", "jpg", "jpeg", "bmp", "gif"] | None, Spec(short="f", help="The output format for bulk conversion.")] = None,
-        resize: Annotated[int | None, Spec(short="r", help="Resize the output image to a specific width (maintaining aspect ratio).", prompt=False)] = None,
-        quality: Annotated[int | None, Spec(short="q", help="Set the quality of the output image (1-100, for JPEG).", prompt=False)] = None
-):
-    """Main function to parse arguments and run the conversion"""
-
-    # Get a list of files to convert
-    input_files = glob.glob(input)
-
-    # Check if any files were found
-    if not input_files:
-        print(f"Error: No input files found for pattern '{input}'", file=sys.stderr)
-        sys.exit(1)
+# The main entrypoint of the script
+# (the CLI is only defined here, so `convert_image` can be imported without pulling it in)
+if __name__ == "__main__":
+    from defcmd import cmd, Spec
+
+    @cmd(epilog="Example: python scripts/images/convert.py 'images/*.jpg' 'converted/' --format png --resize 800 --quality 85")
+    def main(
+            input: Annotated[str, Spec(help="Path to the input image file or a glob pattern for multiple files.")],
+            output: Annotated[str, Spec(help="Path to save the converted image or a directory for bulk conversion.")],
+            format: Annotated[Literal["png", "jpg", "jpeg", "bmp", "gif"] | None, Spec(short="f", help="The output format for bulk conversion.")] = None,
+            resize: Annotated[int | None, Spec(short="r", help="Resize the output image to a specific width (maintaining aspect ratio).", prompt=False)] = None,
+            quality: Annotated[int | None, Spec(short="q", help="Set the quality of the output image (1-100, for JPEG).", prompt=False)] = None,
+            jobs: Annotated[int, Spec(short="j", help="Number of images to convert in parallel (0 for one per CPU core).", prompt=False)] = 0,
+            retries: Annotated[int, Spec(help="Number of times to retry an image that failed to convert.", prompt=False)] = 0,
+            stats: Annotated[Literal["text", "json"] | None, Spec(help="Print per-stage timings and throughput to stderr in this format.", prompt=False)] = None,
+            profile: Annotated[str | None, Spec(help="Write a cProfile dump to this path.", prompt=False)] = None,
+    ):
+        """Main function to parse arguments and run the conversion"""
+
+        # Get a list of files to convert
+        input_files = glob.glob(input)
+
+        # Check if any files were found
+        if not input_files:
+            print(f"Error: No input files found for pattern '{input}'", file=sys.stderr)
+            sys.exit(1)
 
-    bulk_output = os.path.isdir(output) or len(input_files) > 1
+        bulk_output = os.path.isdir(output) or len(input_files) > 1
 
-    # If the output is a directory, bulk convert
-    if bulk_output:
+        # If the output is a directory, bulk convert
+        if bulk_output:
 
-        if os.path.exists(output) and not os.path.isdir(output):
-            print(f"Error: Output path exists and is not a directory: '{output}'", file=sys.stderr)
-            sys.exit(1)
+            if os.path.exists(output) and not os.path.isdir(output):
+                print(f"Error: Output path exists and is not a directory: '{output}'", file=sys.stderr)
+                sys.exit(1)
 
-        if not format:
-            print("Error: Output format must be specified with --format for bulk conversion", file=sys.stderr)
-            sys.exit(1)
+            if not format:
+                print("Error: Output format must be specified with --format for bulk conversion", file=sys.stderr)
+                sys.exit(1)
 
-        # Create the output directory if it doesn't exist
-        os.makedirs(output, exist_ok=True)
+            # Create the output directory if it doesn't exist
+            os.makedirs(output, exist_ok=True)
 
-        # Convert each file
-        for input_path in input_files:
-            # Create the output path
-            basename = os.path.basename(input_path)
-            filename, _ = os.path.splitext(basename)
-            output_path = os.path.join(output, f"{filename}.{format}")
-            # Convert the image
-            convert_image(input_path, output_path, resize, quality)
+            # Convert each file, carrying on past the ones that fail
+            with instrument(stats, profile):
+                _, failures = run_batch(convert_into, input_files, output, format, resize, quality, jobs=jobs, retries=retries)
 
-        return
+            report_failures(failures)
+            if failures:
+                sys.exit(1)
+            return
 
-    # If there are multiple input files but the output is not a directory, exit
-    if len(input_files) > 1:
-        print("Error: Multiple input files detected, but the output is not a directory", file=sys.stderr)
-        sys.exit(1)
+        # If there are multiple input files but the output is not a directory, exit
+        if len(input_files) > 1:
+            print("Error: Multiple input files detected, but the output is not a directory", file=sys.stderr)
+            sys.exit(1)
 
-    # Otherwise, convert the single file
-    convert_image(input_files[0], output, resize, quality)
+        # Otherwise, convert the single file
+        with instrument(stats, profile) as recorder, recorder.file(input_files[0]):
+            convert_image(input_files[0], output, resize, quality)
 
-# The main entrypoint of the script
-if __name__ == "__main__":
     try:
         main.run()
     except Exception as e:
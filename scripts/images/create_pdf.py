@@ -13,12 +13,16 @@ A script to create a PDF file from a collection of images
 # ///
 
 # Library
+import os
 import sys
 import glob
 from defcmd import cmd, Spec
-from typing import Annotated
+from typing import Annotated, Literal
 
-from PIL import Image
+# Shared helpers live in `scripts/common`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.stats import stats, instrument
+from common.batch import run_batch, report_failures
 
 @cmd
 def main(
@@ -31,6 +35,22 @@ def main(
             help="Path to the output PDF file.",
             prompt="Output PDF path",
         )] = "output.pdf",
+
+        stats: Annotated[Literal["text", "json"] | None, Spec(
+            help="Print per-stage timings and throughput to stderr in this format.",
+            prompt=False,
+        )] = None,
+
+        profile: Annotated[str | None, Spec(
+            help="Write a cProfile dump to this path.",
+            prompt=False,
+        )] = None,
+
+        jobs: Annotated[int, Spec(
+            short="j",
+            help="Number of images to load in parallel (0 for one per CPU core).",
+            prompt=False,
+        )] = 0,
     ):
 
     """A script to create a PDF file from a collection of images."""
@@ -42,33 +62,56 @@ def main(
         print(f"\x1b[31mError: No input files found for pattern '{input}'\x1b[0m", file=sys.stderr)
         raise SystemExit(1)
 
-    create_pdf(input_files, output)
+    with instrument(stats, profile):
+        failures = create_pdf(input_files, output, jobs)
+
+    report_failures(failures)
+    if failures:
+        raise SystemExit(1)
 
 # CREATE PDF
 # ----------
 
-def create_pdf(image_files: list[str], output_path: str):
+def load_image(path: str):
+    """Opens an image and decodes it fully, so the decoding can run in parallel"""
+    from PIL import Image
+
+    with stats.stage("decode"):
+        image = Image.open(path)
+        image.load()
+    return image
+
+
+def create_pdf(image_files: list[str], output_path: str, jobs: int = 0) -> list[dict]:
     """
     Creates a PDF from a list of image files.
 
     This function takes a list of image file paths and combines them into a single PDF document.
-    The images are appended in the order they appear in the input list.
+    The images are appended in the order they appear in the input list. They're decoded on a pool
+    of threads (Pillow releases the GIL while decoding); images that fail to load are left out.
 
     #### Parameters:
         `image_files (list[str])`: A list of paths to the image files.
         `output_path (str)`: The path to save the output PDF file.
+        `jobs (int)`: The number of images to load in parallel (0 for one per CPU core).
+
+    #### Returns:
+        `list[dict]`: The images that failed to load, and why (see `common.batch.run_batch`).
 
     #### Errors:
-        `FileNotFoundError`: If any of the input image files cannot be found.
-        `Exception`: Catches and reports other potential errors during PDF creation.
+        `Exception`: Propagates errors from writing the PDF to be handled by the caller.
     """
     # Ensure there are images to process
     if not image_files:
         print("No image files found.", file=sys.stderr)
-        return
+        return []
 
-    # Open all images
-    images = [Image.open(f) for f in image_files]
+    # Open all images, skipping the ones that fail
+    loaded, failures = run_batch(load_image, image_files, jobs=jobs, pool="thread")
+    images = [image for image in loaded if image is not None]
+    if not images:
+        print("None of the images could be loaded.", file=sys.stderr)
+        return failures
 
     # Get the first image
     first_image = images[0]
@@ -77,9 +120,12 @@ def create_pdf(image_files: list[str], output_path: str):
     other_images = images[1:]
 
     # Save the first image as a PDF, and append the rest
-    first_image.save(output_path, "PDF", resolution=100.0, save_all=True, append_images=other_images)
+    with stats.stage("encode"):
+        first_image.save(output_path, "PDF", resolution=100.0, save_all=True, append_images=other_images)
+    stats.count(pages=len(images))
 
     print(f"Successfully created PDF: {output_path} ☑️")
+    return failures
 
 # MAIN
 # ----
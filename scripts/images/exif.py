@@ -14,46 +14,13 @@ A script to extract EXIF information from an image
 
 # Library
 import sys
-from PIL import Image
-from PIL.ExifTags import TAGS
 import json
-from defcmd import cmd, Spec
 from typing import Literal, Annotated
 from pathlib import Path
 
 # EXIF
 # ----
 
-@cmd
-def main(
-        path: Annotated[Path, Spec(
-            help="Path to the image file",
-            validate=lambda p: p.is_file()
-        )],
-        
-        format: Annotated[Literal["json", "text"], Spec(
-            short="f",
-            help="The output format for EXIF information",
-        )] = "text",
-    ):
-
-    """Extract EXIF information from an image"""
-
-    # Extract EXIF info from the image
-    exif_info = exif(str(path))
-
-    # If no EXIF info is found, exit silently
-    if not exif_info:
-        return
-
-    # Output the EXIF info in the desired format    
-    if format == "json":
-        print(json.dumps(exif_info, indent=4))
-    else:
-        for tag, value in exif_info.items():
-            print(f"{tag}: {value}")
-
-
 def exif(path: str):
     """
     Extracts EXIF information from the given image.
@@ -70,6 +37,9 @@ def exif(path: str):
     #### Errors:
         Propagate exceptions from the Pillow library or file system operations to be handled by the caller.
     """
+    from PIL import Image
+    from PIL.ExifTags import TAGS
+
     ret = {}
     with Image.open(path) as img:
         info = img._getexif()
@@ -90,7 +60,39 @@ def exif(path: str):
 # ----
 
 # The main entrypoint of the script
+# (the CLI is only defined here, so `exif` can be imported without pulling it in)
 if __name__ == "__main__":
+    from defcmd import cmd, Spec
+
+    @cmd
+    def main(
+            path: Annotated[Path, Spec(
+                help="Path to the image file",
+                validate=lambda p: p.is_file()
+            )],
+
+            format: Annotated[Literal["json", "text"], Spec(
+                short="f",
+                help="The output format for EXIF information",
+            )] = "text",
+        ):
+
+        """Extract EXIF information from an image"""
+
+        # Extract EXIF info from the image
+        exif_info = exif(str(path))
+
+        # If no EXIF info is found, exit silently
+        if not exif_info:
+            return
+
+        # Output the EXIF info in the desired format    
+        if format == "json":
+            print(json.dumps(exif_info, indent=4))
+        else:
+            for tag, value in exif_info.items():
+                print(f"{tag}: {value}")
+
     try:
         main.run()
     except Exception as e:
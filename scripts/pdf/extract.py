@@ -20,8 +20,12 @@ import sys
 import glob
 import json
 from defcmd import cmd, Spec
-from pypdf import PdfReader
-from typing import Annotated
+from typing import Annotated, Literal
+
+# Shared helpers live in `scripts/common`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.stats import stats, instrument
+from common.batch import run_batch, report_failures
 
 # EXTRACT TEXT
 # ------------
@@ -40,14 +44,20 @@ def extract_text(input_path: str, output_dir: str):
     #### Errors:
         Propagate exceptions from the `pypdf` library or file system operations to be handled by the caller.
     """
-    reader = PdfReader(input_path)
+    from pypdf import PdfReader
+
+    with stats.stage("parse"):
+        reader = PdfReader(input_path)
+        pages = reader.pages
 
     # Extract text from each page
     text = ""
-    for page in reader.pages:
-        extracted = page.extract_text()
-        if extracted:
-            text += extracted + "\n"
+    with stats.stage("extract"):
+        for page in pages:
+            extracted = page.extract_text()
+            if extracted:
+                text += extracted + "\n"
+    stats.count(pages=len(pages))
 
     # Create the output path
     basename = os.path.basename(input_path)
@@ -55,7 +65,7 @@ def extract_text(input_path: str, output_dir: str):
     output_path = os.path.join(output_dir, f"{filename}.txt")
 
     # Save the text to a file
-    with open(output_path, "w", encoding="utf-8") as f:
+    with stats.stage("write"), open(output_path, "w", encoding="utf-8") as f:
         f.write(text)
 
     print(f"Successfully extracted text from '{input_path}' to '{output_path}'")
@@ -77,7 +87,10 @@ def extract_images_from_pdf(input_path: str, output_dir: str):
     #### Errors:
         Propagate exceptions from the `pypdf` library or file system operations to be handled by the caller.
     """
-    reader = PdfReader(input_path)
+    from pypdf import PdfReader
+
+    with stats.stage("parse"):
+        reader = PdfReader(input_path)
     
     # Create the output directory if it does not exist
     os.makedirs(output_dir, exist_ok=True)
@@ -85,8 +98,10 @@ def extract_images_from_pdf(input_path: str, output_dir: str):
     # Extract images from the PDF pages and write them to disk
     image_count = 0
     for page_num, page in enumerate(reader.pages):
-        for image_file_object in page.images:
-            with open(os.path.join(output_dir, f"page{page_num+1}_{image_file_object.name}"), "wb") as fp:
+        with stats.stage("images"):
+            image_file_objects = list(page.images)
+        for image_file_object in image_file_objects:
+            with stats.stage("write"), open(os.path.join(output_dir, f"page{page_num+1}_{image_file_object.name}"), "wb") as fp:
                 fp.write(image_file_object.data)
                 image_count += 1
     
@@ -111,10 +126,14 @@ def extract_metadata(input_path: str, output_dir: str):
     #### Errors:
         Propagate exceptions from the `pypdf` library or file system operations to be handled by the caller.
     """
-    reader = PdfReader(input_path)
+    from pypdf import PdfReader
+
+    with stats.stage("parse"):
+        reader = PdfReader(input_path)
 
     # Retrieve the metadata from the PDF reader
-    metadata = reader.metadata
+    with stats.stage("metadata"):
+        metadata = reader.metadata
 
     # Parse it into a dictionary    
     meta_dict = {}
@@ -132,11 +151,40 @@ def extract_metadata(input_path: str, output_dir: str):
     output_path = os.path.join(output_dir, f"{filename}.metadata.json")
 
     # Save the metadata to a JSON file
-    with open(output_path, "w", encoding="utf-8") as f:
+    with stats.stage("write"), open(output_path, "w", encoding="utf-8") as f:
         json.dump(meta_dict, f, indent=4)
 
     print(f"Successfully extracted metadata from '{input_path}' to '{output_path}'")
 
+# EXTRACT
+# -------
+
+def extract(input_path: str, output_dir: str, images: bool = True, metadata: bool = True):
+    """
+    Extracts the text, and optionally the images and metadata, from a PDF file into the output directory.
+
+    The images are saved in a subdirectory named after the PDF.
+
+    #### Parameters:
+        `input_path (str)`: The path to the input PDF file.
+        `output_dir (str)`: The directory where the extracted content will be saved.
+        `images (bool)`: Whether to extract the images.
+        `metadata (bool)`: Whether to extract the metadata.
+    """
+    # Extract text
+    extract_text(input_path, output_dir)
+
+    # Extract images if requested
+    if images:
+        basename = os.path.basename(input_path)
+        filename, _ = os.path.splitext(basename)
+        image_output_dir = os.path.join(output_dir, filename)
+        extract_images_from_pdf(input_path, image_output_dir)
+
+    # Extract metadata if requested
+    if metadata:
+        extract_metadata(input_path, output_dir)
+
 # MAIN
 # ----
 
@@ -146,6 +194,10 @@ def main(
         output: Annotated[str, Spec(help="Path to the output directory to save the extracted content")],
         images: Annotated[bool, Spec(help="Extract images from the PDF files")] = True,
         metadata: Annotated[bool, Spec(help="Extract metadata from the PDF files")] = True,
+        jobs: Annotated[int, Spec(short="j", help="Number of PDF files to process in parallel (0 for one per CPU core)", prompt=False)] = 0,
+        retries: Annotated[int, Spec(help="Number of times to retry a PDF file that failed", prompt=False)] = 0,
+        stats: Annotated[Literal["text", "json"] | None, Spec(help="Print per-stage timings and throughput to stderr in this format", prompt=False)] = None,
+        profile: Annotated[str | None, Spec(help="Write a cProfile dump to this path", prompt=False)] = None,
     ):
     """Extract text, images, and metadata from PDF files"""
 
@@ -160,24 +212,21 @@ def main(
     # Create the output directory if it doesn't exist
     os.makedirs(output, exist_ok=True)
 
-    # Process each file
+    # Skip anything that isn't a PDF
+    pdf_files = []
     for input_file in input_files:
-        if input_file.lower().endswith(".pdf"):
-            # Extract text
-            extract_text(input_file, output)
-
-            # Extract images if requested
-            if images:
-                basename = os.path.basename(input_file)
-                filename, _ = os.path.splitext(basename)
-                image_output_dir = os.path.join(output, filename)
-                extract_images_from_pdf(input_file, image_output_dir)
-
-            # Extract metadata if requested
-            if metadata:
-                extract_metadata(input_file, output)
-        else:
+        if not input_file.lower().endswith(".pdf"):
             print(f"Skipping non-PDF file: '{input_file}'", file=sys.stderr)
+            continue
+        pdf_files.append(input_file)
+
+    # Process each file, carrying on past the ones that fail
+    with instrument(stats, profile):
+        _, failures = run_batch(extract, pdf_files, output, images, metadata, jobs=jobs, retries=retries)
+
+    report_failures(failures)
+    if failures:
+        sys.exit(1)
 
 # The main entrypoint of the script
 if __name__ == "__main__":
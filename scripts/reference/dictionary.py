@@ -14,24 +14,401 @@ Lookup a word definition using the Free Dictionary API (https://dictionaryapi.de
 
 import sys
 import os
-import requests
+import time
+import sqlite3
+import threading
+import zlib
+import itertools
 import json
+import urllib.parse
+from collections import deque
 from defcmd import cmd, Spec
-from typing import Literal, Annotated
+from typing import Literal, Annotated, Iterable, Iterator, TYPE_CHECKING
 
+# `requests` is slow to import, so it's only imported once a lookup actually hits the network
+if TYPE_CHECKING:
+    import requests
 
-def lookup(word: str):
+
+# The API endpoint and cache location can be overridden (e.g. to point at a local stand-in server)
+API_URL = os.environ.get("DICTIONARY_API_URL", "https://api.dictionaryapi.dev/api/v2/entries/en")
+CACHE_PATH = os.environ.get("DICTIONARY_CACHE", os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "dictionary", "cache.sqlite3"))
+BUNDLE_PATH = os.environ.get("DICTIONARY_BUNDLE", os.path.join(os.environ.get("XDG_DATA_HOME", os.path.expanduser("~/.local/share")), "dictionary", "bundle.sqlite3"))
+
+DAY = 24 * 60 * 60
+
+
+# CACHE
+# -----
+
+class Cache:
+    """
+    A persistent on-disk cache of API responses, backed by SQLite.
+
+    Successful responses expire after `ttl` seconds, and "not found" (404) responses after `negative_ttl` seconds.
+    Once the cache holds more than `max_entries` words, the least recently used entries are evicted.
+    """
+
+    # Only these responses are worth remembering; anything else (rate limits, server errors) is transient
+    CACHEABLE = (200, 404)
+
+    def __init__(self, path: str = CACHE_PATH, ttl: int = 30 * DAY, negative_ttl: int = DAY, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # The connection is shared between the worker threads in batch mode, so guard it with a lock
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                word     TEXT PRIMARY KEY,
+                status   INTEGER NOT NULL,
+                body     TEXT NOT NULL,
+                fetched  REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.db.commit()
+
+    def get(self, word: str, stale: bool = False) -> tuple[int, str] | None:
+        """Returns the cached `(status, body)` for a word, or `None` if it is missing or expired (unless `stale` is set)"""
+        key = word.strip().lower()
+        with self.lock:
+            row = self.db.execute("SELECT status, body, fetched FROM responses WHERE word = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+            status, body, fetched = row
+            now = time.time()
+            ttl = self.ttl if status == 200 else self.negative_ttl
+            if now - fetched > ttl and not stale:
+                return None
+
+            # Mark the entry as recently used
+            self.db.execute("UPDATE responses SET accessed = ? WHERE word = ?", (now, key))
+            self.db.commit()
+            return status, body
+
+    def put(self, word: str, status: int, body: str):
+        """Stores a response for a word (unless it is transient or malformed), evicting the least recently used entries if the cache is full"""
+        if status not in self.CACHEABLE:
+            return
+
+        # A 200 that isn't JSON is a login or error page from something on the way, not an answer from the API
+        if status == 200:
+            try:
+                json.loads(body)
+            except ValueError:
+                return
+
+        key = word.strip().lower()
+        now = time.time()
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", (key, status, body, now, now))
+            self.db.execute("""
+                DELETE FROM responses WHERE word IN (
+                    SELECT word FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self.db.commit()
+
+
+# OFFLINE BUNDLE
+# --------------
+
+class Bundle:
+    """
+    A local store of dictionary entries imported from a bulk dump, for hosts that can't reach the API.
+
+    Each entry is stored zlib-compressed under its lowercased word. The words form the primary key
+    of a `WITHOUT ROWID` table, so both exact lookups and prefix listings are a single B-tree range scan.
+    """
+
+    def __init__(self, path: str = BUNDLE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                word  TEXT NOT NULL,
+                seq   INTEGER NOT NULL,
+                entry BLOB NOT NULL,
+                PRIMARY KEY (word, seq)
+            ) WITHOUT ROWID
+        """)
+        self.db.commit()
+
+    def import_dump(self, path: str) -> int:
+        """
+        Imports a dictionary dump into the bundle, replacing any existing entries for the words it contains.
+
+        The dump is either a JSON array of entries (the same shape the API returns), or JSON Lines
+        where each line holds one entry or an array of them. JSON Lines dumps are streamed, so they
+        can be much larger than memory.
+
+        #### Parameters:
+            `path (str)`: The path to the dump file (`-` for stdin).
+
+        #### Returns:
+            `int`: The number of entries imported.
+        """
+        file = sys.stdin if path == "-" else open(path, encoding="utf-8")
+        with file:
+            count = 0
+            seen = set()
+            with self.lock, self.db:
+                for entry in self._read_dump(file):
+                    word = entry.get("word", "").strip().lower()
+                    if not word:
+                        continue
+                    if word not in seen:
+                        seen.add(word)
+                        self.db.execute("DELETE FROM entries WHERE word = ?", (word,))
+                    blob = zlib.compress(json.dumps(entry, separators=(",", ":")).encode("utf-8"))
+                    self.db.execute("INSERT INTO entries VALUES (?, ?, ?)", (word, count, blob))
+                    count += 1
+        return count
+
+    @staticmethod
+    def _read_dump(file) -> Iterator[dict]:
+        """Yields the entries of a dump, which is either a JSON array (or a single entry) or JSON Lines"""
+        first = file.readline()
+        while first and not first.strip():
+            first = file.readline()
+
+        if not first:
+            return
+
+        # A first line that isn't complete JSON opens a (pretty-printed) JSON array, which has to be parsed in one go.
+        # Checking the prefix isn't enough: a JSON Lines dump can hold an array of entries on each line.
+        try:
+            head = json.loads(first)
+        except ValueError:
+            records = [json.loads(first + file.read())]
+        else:
+            # JSON Lines can be parsed one line at a time
+            records = itertools.chain([head], (json.loads(line) for line in file if line.strip()))
+
+        # Each record is a single entry or an array of them
+        for record in records:
+            for entry in record if isinstance(record, list) else [record]:
+                if not isinstance(entry, dict):
+                    raise ValueError(f"Dictionary entries must be JSON objects, but the dump contains {json.dumps(entry)[:60]}")
+                yield entry
+
+    def get(self, word: str) -> str | None:
+        """Returns the entries for a word as a JSON array (like the API response body), or `None` if it is not in the bundle"""
+        with self.lock:
+            rows = self.db.execute("SELECT entry FROM entries WHERE word = ? ORDER BY seq", (word.strip().lower(),)).fetchall()
+        if not rows:
+            return None
+        return "[" + ",".join(zlib.decompress(entry).decode("utf-8") for (entry,) in rows) + "]"
+
+    def prefix(self, prefix: str, limit: int = 20) -> list[str]:
+        """Returns up to `limit` words (in sorted order) that start with the given prefix"""
+        prefix = prefix.strip().lower()
+        if limit <= 0:
+            limit = -1
+
+        with self.lock:
+            if not prefix:
+                rows = self.db.execute("SELECT DISTINCT word FROM entries ORDER BY word LIMIT ?", (limit,)).fetchall()
+            else:
+                # Every word with the prefix sorts between the prefix itself and the prefix with its last character bumped
+                upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+                rows = self.db.execute(
+                    "SELECT DISTINCT word FROM entries WHERE word >= ? AND word < ? ORDER BY word LIMIT ?",
+                    (prefix, upper, limit),
+                ).fetchall()
+        return [word for (word,) in rows]
+
+
+# RATE LIMITER
+# ------------
+
+class RateLimiter:
+    """
+    Spaces out requests so that no more than `rate` are started per second (or any number, without a rate), across all threads.
+
+    When the server pushes back (HTTP 429), `pause()` holds off every thread, not just the one that was rejected.
+    """
+
+    def __init__(self, rate: float | None = None):
+        self.interval = 1 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next = time.monotonic()
+
+    def wait(self):
+        """Blocks until the caller is allowed to start the next request"""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next, now)
+            self.next = slot + self.interval
+        time.sleep(max(0, slot - now))
+
+    def pause(self, seconds: float):
+        """Delays all subsequent requests by at least `seconds`"""
+        with self.lock:
+            self.next = max(self.next, time.monotonic() + seconds)
+
+
+def retry_delay(response: "requests.Response", attempt: int) -> float:
+    """Returns how long to back off after a 429, honouring the `Retry-After` header when it is given in seconds"""
+    retry_after = response.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        return int(retry_after)
+    return 2 ** attempt
+
+
+# LOOKUP
+# ------
+
+def fetch(
+        word: str,
+        cache: Cache | None = None,
+        offline: bool = False,
+        session: "requests.Session | None" = None,
+        limiter: RateLimiter | None = None,
+        retries: int = 3,
+        bundle: Bundle | None = None,
+    ) -> tuple[int, str]:
+    """Fetches the raw `(status, body)` API response for a word, serving it from the offline bundle or the cache when possible"""
+
+    if bundle is not None:
+        body = bundle.get(word)
+        if body is not None:
+            return 200, body
+
+    if cache is not None:
+        # In offline mode, an expired entry is still better than nothing
+        cached = cache.get(word, stale=offline)
+        if cached is not None:
+            return cached
+
+    if offline:
+        raise LookupError(f"'{word}' is not in the cache (offline mode)")
+
+    import requests
+
+    api_url = f"{API_URL}/{urllib.parse.quote(word.strip(), safe='')}"
+    http = session or requests
+
+    # Back off and retry when rate limited
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.wait()
+        response = http.get(api_url)
+        if response.status_code != 429 or attempt == retries:
+            break
+        delay = retry_delay(response, attempt)
+        if limiter is not None:
+            limiter.pause(delay)
+        else:
+            time.sleep(delay)
+
+    if cache is not None:
+        cache.put(word, response.status_code, response.text)
+
+    return response.status_code, response.text
+
+
+def lookup(word: str, cache: Cache | None = None, offline: bool = False, bundle: Bundle | None = None):
     """Looks up the definition of a word using the Free Dictionary API"""
- 
-    api_url=f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}"
-    response = requests.get(api_url)
 
-    if response.status_code != 200:
-        print(f"Error: Unable to fetch definition for '{word}'. HTTP Status Code: {response.status_code}", file=sys.stderr)
-        print(f"Response: {response.text}", file=sys.stderr)
+    status, body = fetch(word, cache, offline, bundle=bundle)
+
+    if status != 200:
+        print(f"Error: Unable to fetch definition for '{word}'. HTTP Status Code: {status}", file=sys.stderr)
+        print(f"Response: {body}", file=sys.stderr)
         sys.exit(1)
 
-    return response.json()
+    return json.loads(body)
+
+
+# BATCH LOOKUP
+# ------------
+
+def read_words(path: str) -> Iterator[str]:
+    """Yields the non-empty lines of a file (or stdin, if the path is `-`) as words"""
+    file = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with file:
+        for line in file:
+            word = line.strip()
+            if word:
+                yield word
+
+
+def lookup_batch(
+        words: Iterable[str],
+        concurrency: int = 8,
+        rate: float | None = None,
+        cache: Cache | None = None,
+        offline: bool = False,
+        bundle: Bundle | None = None,
+    ) -> Iterator[dict]:
+    """
+    Looks up many words concurrently, yielding one result per word in input order.
+
+    Requests are spread over `concurrency` threads sharing a single keep-alive connection pool,
+    optionally throttled to `rate` requests per second. Only a bounded window of words is in flight
+    at any time, so arbitrarily long inputs are streamed rather than loaded into memory.
+
+    #### Parameters:
+        `words (Iterable[str])`: The words to look up.
+        `concurrency (int)`: The number of lookups to run at the same time.
+        `rate (float | None)`: The maximum number of requests per second, or `None` for no limit.
+        `cache (Cache | None)`: The response cache to consult and populate.
+        `offline (bool)`: Serve results only from the cache.
+        `bundle (Bundle | None)`: The offline bundle to consult before the cache and the network.
+
+    #### Returns:
+        `Iterator[dict]`: Records of the form `{"word", "status", "entries"}`, or `{"word", "status", "error"}` if the lookup failed.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from concurrent.futures import ThreadPoolExecutor
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # Shared even without a rate, so that a 429 pauses every thread
+    limiter = RateLimiter(rate)
+
+    def task(word: str) -> dict:
+        try:
+            status, body = fetch(word, cache, offline, session, limiter, bundle=bundle)
+        except Exception as e:
+            return {"word": word, "status": None, "error": str(e)}
+        if status != 200:
+            return {"word": word, "status": status, "error": body}
+        # Something in between (like a captive portal) can answer 200 with a page that isn't JSON
+        try:
+            entries = json.loads(body)
+        except ValueError as e:
+            return {"word": word, "status": status, "error": f"Invalid JSON in response: {e}"}
+        return {"word": word, "status": status, "entries": entries}
+
+    with session, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = deque()
+        for word in words:
+            pending.append(executor.submit(task, word))
+            # Keep a few lookups queued per thread, but never more than that
+            if len(pending) >= concurrency * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
 
 
 def print_definitions(entry):
@@ -85,14 +462,53 @@ RESET="\033[0m"
 
 @cmd
 def dictionary(
-        word:   Annotated[str,                              Spec(help="The word to look up"                         )], 
-        format: Annotated[Literal["text", "raw", "json"],   Spec(help="The output format",              prompt=False)]  = "text", 
-        color:  Annotated[bool,                             Spec(help="Enable or disable color output", prompt=False)]  = True
+        word:        Annotated[str,                              Spec(help="The word to look up (or, with --batch, a file of words; '-' for stdin)"        )], 
+        format:      Annotated[Literal["text", "raw", "json"],   Spec(help="The output format",                                               prompt=False)]  = "text", 
+        color:       Annotated[bool,                             Spec(help="Enable or disable color output",                                  prompt=False)]  = True,
+        cache:       Annotated[bool,                             Spec(help="Enable or disable the on-disk response cache",                    prompt=False)]  = True,
+        ttl:         Annotated[int,                              Spec(help="Number of seconds a cached definition stays fresh",               prompt=False)]  = 30 * DAY,
+        cache_size:  Annotated[int,                              Spec(help="Maximum number of words to keep in the cache",                    prompt=False)]  = 10_000,
+        offline:     Annotated[bool,                             Spec(help="Serve definitions only from the cache, never the network",        prompt=False)]  = False,
+        batch:       Annotated[bool,                             Spec(help="Look up every word in the given file and stream JSONL results",   prompt=False)]  = False,
+        concurrency: Annotated[int,                              Spec(help="Number of concurrent lookups in batch mode",                      prompt=False)]  = 8,
+        rate:        Annotated[float | None,                     Spec(help="Maximum number of requests per second in batch mode",             prompt=False)]  = None,
+        import_dump: Annotated[bool,                             Spec(help="Import the dictionary dump at the given path for offline use",    prompt=False)]  = False,
+        prefix:      Annotated[bool,                             Spec(help="List the words in the offline bundle starting with the word",     prompt=False)]  = False,
+        limit:       Annotated[int,                              Spec(help="Maximum number of words to list with --prefix (0 for no limit)",  prompt=False)]  = 20,
     ):
     """Command-line interface to look up word definitions using the Free Dictionary API"""
 
+    # Import a dictionary dump into the offline bundle
+    if import_dump:
+        count = Bundle().import_dump(word)
+        print(f"Imported {count} entries into '{BUNDLE_PATH}'", file=sys.stderr)
+        return
+
+    # Open the offline bundle, if one has been imported
+    offline_bundle = Bundle() if os.path.exists(BUNDLE_PATH) else None
+
+    # List the words starting with the given prefix
+    if prefix:
+        if offline_bundle is None:
+            raise LookupError(f"No offline bundle found at '{BUNDLE_PATH}' (import a dictionary dump first)")
+        words = offline_bundle.prefix(word, limit)
+        if format == "json":
+            print(json.dumps(words, indent=2))
+        else:
+            print("\n".join(words))
+        return
+
+    # Open the response cache (offline mode can't work without one)
+    response_cache = Cache(ttl=ttl, max_entries=cache_size) if cache or offline else None
+
+    # In batch mode, stream one JSON record per word
+    if batch:
+        for record in lookup_batch(read_words(word), concurrency, rate, response_cache, offline, offline_bundle):
+            sys.stdout.write(json.dumps(record) + "\n")
+        return
+
     # Lookup the word and get the api results
-    result = lookup(word)
+    result = lookup(word, response_cache, offline, offline_bundle)
 
     # Print the result in JSON format if requested
     if format == "json":
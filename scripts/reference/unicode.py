@@ -7,7 +7,6 @@ Inspect and Search Unicode Characters using Python's unicodedata module.
 # /// script
 # requires-python = ">=3.12"
 # dependencies = [
-#   "requests",
 #   "defcmd @ git+https://github.com/Shresht7/defcmd.git@v0.5.1"
 # ]
 # ///
@@ -70,6 +69,25 @@ def char_info(ch: str) -> dict:
         'mirrored': unicodedata.mirrored(ch)
     }
 
+
+def find(query: str, max: int = 20) -> list[tuple[int, str]]:
+    """Returns the `(codepoint, name)` of up to `max` characters (0 for no limit) whose name contains the query"""
+    query = query.lower()
+    results = []
+
+    for codepoint in range(sys.maxunicode + 1):
+        try:
+            name = unicodedata.name(chr(codepoint))
+        except ValueError:
+            continue
+
+        if query in name.lower():
+            results.append((codepoint, name))
+            if max > 0 and len(results) >= max:
+                break
+
+    return results
+
 # ---
 # CLI
 # ---
@@ -94,19 +112,7 @@ def info(char: str):
 @cli.subcmd(prompt_optional=False)
 def search(query: str, max: int = 20):
     """Search for Unicode characters by name"""
-    query = query.lower()
-    results = []
-
-    for codepoint in range(sys.maxunicode + 1):
-        try:
-            name = unicodedata.name(chr(codepoint))
-        except ValueError:
-            continue
-
-        if query in name.lower():
-            results.append((codepoint, name))
-            if max > 0 and len(results) >= max:
-                break
+    results = find(query, max)
 
     for codepoint, name in results:
         print(f"U+{codepoint:04X}  {chr(codepoint)}  {name}")